@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+解析结果传输基准测试
+
+在本机回环地址上启动真实 HTTP 服务，对比 /api/parse 式的完整 JSON 响应（只含同一份 Markdown）
+与 /api/content/<id>（ETag / 压缩 / 章节 / Range）在首次打开和重复打开时的传输字节数与延迟。
+
+字节数为响应的全部线上字节（状态行 + 响应头 + 分块编码后的响应体），
+延迟为回环连接上从发出请求到完整收到响应的时间，不含真实网络的传输延迟。
+
+用法: python3 scripts/bench_content.py [--file paper.md] [--repeat 20]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import tempfile
+import threading
+import argparse
+
+
+def make_markdown(sections: int = 40, paragraphs: int = 30) -> str:
+    """生成长论文规模的 Markdown（中英混排）"""
+    parts = ["# A Long Paper\n\n"]
+    for i in range(sections):
+        parts.append(f"## Section {i}\n\n")
+        for j in range(paragraphs):
+            parts.append(f"Paragraph {j} of section {i}: the proposed method improves "
+                         f"accuracy by {i + j}% 相比基线方法，实验结果表明该方法有效。\n\n")
+    return "".join(parts)
+
+
+def response_complete(data):
+    """按 HTTP 分帧判断响应是否接收完整（Content-Length / chunked 结束块 / 无响应体）"""
+    head_end = data.find(b"\r\n\r\n")
+    if head_end < 0:
+        return False
+    head = data[:head_end].decode('latin-1').lower()
+    body_len = len(data) - head_end - 4
+    status = int(head.split(" ", 2)[1])
+    if status == 304 or status < 200:
+        return True
+    if "transfer-encoding: chunked" in head:
+        return data.endswith(b"0\r\n\r\n")
+    for line in head.split("\r\n"):
+        if line.startswith("content-length:"):
+            return body_len >= int(line.split(":", 1)[1])
+    return False
+
+
+def fetch(port, path, headers):
+    """
+    发送一次 GET 请求，返回 (状态码, 响应线上字节数, 延迟毫秒)
+
+    延迟按响应分帧完整接收计时，不等待服务端关闭连接
+    （开发服务器关闭连接本身有约 10ms 的额外等待，与内容接口无关）。
+    """
+    lines = [f"GET {path} HTTP/1.1", f"Host: 127.0.0.1:{port}", "Connection: close"]
+    lines += [f"{k}: {v}" for k, v in headers.items()]
+    request = ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1')
+
+    data = b""
+    with socket.create_connection(('127.0.0.1', port)) as sock:
+        start = time.perf_counter()
+        sock.sendall(request)
+        while not response_complete(data):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+        elapsed = (time.perf_counter() - start) * 1000
+    status = int(data.split(b" ", 2)[1]) if data else 0
+    return status, len(data), elapsed
+
+
+def measure(port, path, headers=None, repeat=20):
+    """返回 (状态码, 平均线上字节数, 平均延迟毫秒)"""
+    total_bytes = 0
+    total_ms = 0.0
+    status = None
+    for _ in range(repeat):
+        status, size, elapsed = fetch(port, path, headers or {})
+        total_bytes += size
+        total_ms += elapsed
+    return status, total_bytes // repeat, total_ms / repeat
+
+
+def run(markdown, repeat):
+    # server 在导入时读取 PAPER_CONTENT_DIR
+    import server
+    from flask import jsonify
+    from werkzeug.serving import make_server, WSGIRequestHandler
+
+    # 与 /api/parse 相同的 JSON 包装，只包含内容接口也提供的 Markdown；
+    # jsonify 默认转义非 ASCII 字符，字节数与 /api/parse 的实际响应一致
+    legacy = {"success": True, "data": {"markdown": markdown}}
+
+    @server.app.route('/bench/legacy')
+    def bench_legacy():
+        return jsonify(legacy)
+
+    class Handler(WSGIRequestHandler):
+        # HTTP/1.1 下流式响应使用 chunked 传输，与线上部署一致
+        protocol_version = "HTTP/1.1"
+        # 关闭 Nagle，避免响应头与响应体分开写入时的延迟确认等待
+        disable_nagle_algorithm = True
+
+        def log_request(self, *args, **kwargs):
+            pass
+
+    httpd = make_server('127.0.0.1', 0, server.app, threaded=True, request_handler=Handler)
+    port = httpd.server_port
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        entry = server.save_content('bench', markdown)
+        url = '/api/content/bench'
+        etag = f'"{entry["etag"]}-gzip"'
+
+        cases = [
+            ("legacy jsonify (每次完整返回)", '/bench/legacy', {}),
+            ("legacy jsonify gzip 协商", '/bench/legacy', {'Accept-Encoding': 'gzip'}),
+            ("content identity", url, {}),
+            ("content gzip 首次打开", url, {'Accept-Encoding': 'gzip'}),
+            ("content br 首次打开", url, {'Accept-Encoding': 'br'}),
+            ("content 重复打开 (If-None-Match)", url, {'Accept-Encoding': 'gzip', 'If-None-Match': etag}),
+            ("content 单章节 gzip", url + '?section=1', {'Accept-Encoding': 'gzip'}),
+            ("content Range 前 16KB", url, {'Range': 'bytes=0-16383'}),
+        ]
+
+        print(f"Markdown 大小: {len(markdown.encode('utf-8'))} 字节, "
+              f"brotli: {'可用' if server.brotli else '未安装（br 请求按 identity 返回）'}")
+        print("字节 = 响应线上总字节（含状态行/响应头/分块编码）; 延迟 = 本机回环 HTTP 往返")
+        print(f"{'请求':<36}{'状态':>6}{'字节':>12}{'延迟(ms)':>12}")
+        results = []
+        for name, path, headers in cases:
+            status, size, latency = measure(port, path, headers, repeat)
+            results.append({"case": name, "status": status, "wire_bytes": size,
+                            "loopback_latency_ms": round(latency, 3)})
+            print(f"{name:<36}{status:>6}{size:>12}{latency:>12.3f}")
+        return results
+    finally:
+        httpd.shutdown()
+        thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='解析结果传输基准测试')
+    parser.add_argument('--file', type=str, help='Markdown 文件（默认生成测试文档）')
+    parser.add_argument('--repeat', type=int, default=20, help='每种请求重复次数')
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            markdown = f.read()
+    else:
+        markdown = make_markdown()
+
+    # 未指定内容目录时使用临时目录，结束后删除
+    tmp_dir = None
+    if not os.environ.get('PAPER_CONTENT_DIR'):
+        tmp_dir = tempfile.mkdtemp(prefix='bench_content_')
+        os.environ['PAPER_CONTENT_DIR'] = tmp_dir
+    try:
+        results = run(markdown, args.repeat)
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    if os.environ.get('BENCH_JSON'):
+        print(json.dumps(results, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,624 @@
+#!/usr/bin/env python3
+"""
+论文库引用图索引
+
+从 MinerU 输出的 Markdown 中解析参考文献章节，将每条参考文献归一化为
+arXiv ID / DOI / 标题指纹，存入 SQLite 索引。索引按文件内容哈希增量更新，
+用于快速回答：
+
+- 库中哪些论文引用了 X
+- 论文 A 和 B 的共同参考文献
+- 论文 A 引用了库中哪些论文
+
+相关工作生成、多论文对比时只需把这些结果（而不是整篇论文）发给 LLM。
+
+用法:
+    python3 scripts/citation_index.py scan /tmp
+    python3 scripts/citation_index.py cited-by 1706.03762
+    python3 scripts/citation_index.py shared <paper_a> <paper_b>
+"""
+
+import os
+import re
+import sys
+import json
+import glob
+import time
+import hashlib
+import sqlite3
+import unicodedata
+from typing import Optional, Dict, Any, List
+
+# 默认索引文件
+DEFAULT_CITATION_DB = os.environ.get(
+    'PAPER_CITATION_DB',
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'citations.db')
+)
+
+# 参考文献章节标题
+REFERENCE_HEADING_RE = re.compile(
+    r'^\s*(?:\d+\.?\s*)?(references?|bibliography|参考文献|引用文献)\s*[:：]?\s*$', re.I
+)
+HEADING_RE = re.compile(r'^(#{1,6})\s+(.+?)\s*#*\s*$')
+# 条目起始：[12] / 12. / 12) / - / *
+ENTRY_START_RE = re.compile(r'^\s*(?:\[\d+\]|\d{1,3}[.)]\s|[-*]\s)')
+ENTRY_PREFIX_RE = re.compile(r'^\s*(?:\[\d+\]|\d{1,3}[.)]|[-*])\s*')
+
+ARXIV_NEW_RE = re.compile(r'(?:arxiv[:\s]*|arxiv\.org/(?:abs|pdf)/)(\d{4}\.\d{4,5})(?:v\d+)?', re.I)
+ARXIV_OLD_RE = re.compile(r'(?:arxiv[:\s]*|arxiv\.org/(?:abs|pdf)/)([a-z\-]+(?:\.[A-Z]{2})?/\d{7})(?:v\d+)?', re.I)
+DOI_RE = re.compile(r'\b(10\.\d{4,9}/[^\s"<>]+)', re.I)
+QUOTED_TITLE_RE = re.compile(r'[“"]([^”"]{10,300})[”"]')
+YEAR_RE = re.compile(r'\b(19|20)\d{2}[a-z]?\b')
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[a-z0-9\)\]”"?])\.\s+')
+
+# 作者列表：Surname, I. (APA) / I. Surname (IEEE) / Surname I (Vancouver)，以 , / and / & 分隔
+_SURNAME = r"(?:(?:van|von|de|der|den|da|di|le|la|del)\s+)*[A-Z][\w'’\-]*"
+_INITIALS = r"[A-Z]\.(?:\s?-?[A-Z]\.)*"
+# Vancouver 的无点缩写后若紧跟 ". Surname," / ". Surname and" 等，说明是名字中间的缩写（Tom B. Brown），不是作者
+_VANCOUVER_INITIALS = r"[A-Z]{1,3}\b(?!\.\s+[A-Z][a-z][\w'’\-]*(?:,|\.|\s+and\b|\s+&))"
+_AUTHOR = rf"(?:{_SURNAME},\s+{_INITIALS}|{_INITIALS}\s+{_SURNAME}|{_SURNAME}\s+{_VANCOUVER_INITIALS})"
+_AUTHOR_SEP = r"(?:\s*,\s*(?:and\s+|&\s*)?|\s+(?:and|&)\s+)"
+AUTHOR_LIST_RE = re.compile(
+    rf"^\s*{_AUTHOR}(?:{_AUTHOR_SEP}{_AUTHOR})*(?:,?\s+et\s+al\.?)?(?:(?<=\.)|(?=\s*[.,:(]|\s+\d{{4}}))"
+)
+LEADING_YEAR_RE = re.compile(r'^[\s.,:;]*(?:\(?(?:19|20)\d{2}[a-z]?\)?[\s.,:;]*)?')
+
+# 标题解析样例（IEEE / APA / ACL / Vancouver），用于 selfcheck
+TITLE_SAMPLES = [
+    ('K. He, X. Zhang, S. Ren, and J. Sun, “Deep residual learning for image recognition,” '
+     'in Proc. CVPR, 2016, pp. 770–778.',
+     'Deep residual learning for image recognition'),
+    ('A. Vaswani, N. Shazeer, N. Parmar. Attention is all you need. In NeurIPS, 2017. arXiv:1706.03762v5',
+     'Attention is all you need'),
+    ('He, K., Zhang, X., Ren, S., & Sun, J. (2016). Deep residual learning for image recognition. '
+     'In Proceedings of CVPR (pp. 770-778).',
+     'Deep residual learning for image recognition'),
+    ('Devlin, J., Chang, M.-W., Lee, K., and Toutanova, K. BERT: Pre-training of deep bidirectional '
+     'transformers for language understanding. arXiv preprint arXiv:1810.04805, 2018.',
+     'BERT: Pre-training of deep bidirectional transformers for language understanding'),
+    ('Jacob Devlin, Ming-Wei Chang, Kenton Lee, and Kristina Toutanova. 2019. BERT: Pre-training of deep '
+     'bidirectional transformers for language understanding. In NAACL.',
+     'BERT: Pre-training of deep bidirectional transformers for language understanding'),
+    ('He K, Zhang X, Ren S, Sun J. Deep residual learning for image recognition. In: CVPR; 2016. p. 770-8.',
+     'Deep residual learning for image recognition'),
+    ('Brown TB, Mann B, Ryder N, et al. Language models are few-shot learners. Adv Neural Inf Process Syst. 2020;33:1877-901.',
+     'Language models are few-shot learners'),
+    # 名字中带中间缩写的完整作者名（ACL / NeurIPS）
+    ('Tom B. Brown, Benjamin Mann, Nick Ryder, et al. Language models are few-shot learners. In NeurIPS, 2020.',
+     'Language models are few-shot learners'),
+    ('Diederik P. Kingma and Jimmy Ba. 2015. Adam: A method for stochastic optimization. In ICLR.',
+     'Adam: A method for stochastic optimization'),
+    ('Aidan N. Gomez, Mengye Ren, Raquel Urtasun, and Roger B. Grosse. The reversible residual network: '
+     'Backpropagation without storing activations. In NeurIPS, 2017.',
+     'The reversible residual network: Backpropagation without storing activations'),
+    ('Tom B. Brown. Language models are few-shot learners. In NeurIPS, 2020.',
+     'Language models are few-shot learners'),
+    # 短标题
+    ('Y. LeCun, Y. Bengio, and G. Hinton. Deep learning. Nature, 521(7553):436–444, 2015.',
+     'Deep learning'),
+    ('LeCun Y, Bengio Y, Hinton G. Deep learning. Nature. 2015;521(7553):436-44.',
+     'Deep learning'),
+]
+
+TITLE_STOPWORDS = {
+    'a', 'an', 'the', 'of', 'for', 'and', 'in', 'on', 'to', 'with', 'via', 'by', 'from', 'at', 'is'
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    content_hash TEXT NOT NULL,
+    source_path TEXT,
+    source_mtime REAL,
+    source_size INTEGER,
+    ref_count INTEGER NOT NULL DEFAULT 0,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS paper_keys (
+    key TEXT NOT NULL,
+    paper_id TEXT NOT NULL,
+    PRIMARY KEY (key, paper_id)
+);
+CREATE INDEX IF NOT EXISTS idx_paper_keys_paper ON paper_keys (paper_id);
+CREATE TABLE IF NOT EXISTS refs (
+    paper_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    raw TEXT NOT NULL,
+    title TEXT,
+    arxiv TEXT,
+    doi TEXT,
+    PRIMARY KEY (paper_id, idx)
+);
+CREATE TABLE IF NOT EXISTS ref_keys (
+    key TEXT NOT NULL,
+    paper_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    PRIMARY KEY (key, paper_id, idx)
+);
+CREATE INDEX IF NOT EXISTS idx_ref_keys_paper ON ref_keys (paper_id, key);
+"""
+
+
+def extract_reference_section(markdown: str) -> str:
+    """
+    截取参考文献章节：从 References/参考文献 标题开始，到同级或更高级标题为止
+    """
+    lines = markdown.splitlines()
+    start, level = None, 0
+    for i, line in enumerate(lines):
+        match = HEADING_RE.match(line)
+        text = match.group(2) if match else line
+        # MinerU 有时把章节标题输出为普通行（如 "REFERENCES"）
+        if REFERENCE_HEADING_RE.match(text.strip('*_ ')):
+            start, level = i + 1, len(match.group(1)) if match else 7
+    if start is None:
+        return ""
+
+    end = len(lines)
+    for i in range(start, len(lines)):
+        match = HEADING_RE.match(lines[i])
+        if match and len(match.group(1)) <= level:
+            end = i
+            break
+    return "\n".join(lines[start:end])
+
+
+def split_references(section: str) -> List[str]:
+    """将参考文献章节拆分为条目（按编号/列表符号，其次按空行）"""
+    entries: List[str] = []
+    current: List[str] = []
+    numbered = any(ENTRY_START_RE.match(line) for line in section.splitlines())
+    for line in section.splitlines():
+        if not line.strip():
+            if not numbered and current:
+                entries.append(" ".join(current))
+                current = []
+            continue
+        if numbered and ENTRY_START_RE.match(line) and current:
+            entries.append(" ".join(current))
+            current = []
+        current.append(line.strip())
+    if current:
+        entries.append(" ".join(current))
+
+    cleaned = []
+    for entry in entries:
+        entry = ENTRY_PREFIX_RE.sub('', entry).strip()
+        if len(entry) >= 20:
+            cleaned.append(entry)
+    return cleaned
+
+
+def normalize_arxiv(text: str) -> Optional[str]:
+    """提取 arXiv ID（去掉版本号）"""
+    match = ARXIV_NEW_RE.search(text) or ARXIV_OLD_RE.search(text)
+    return match.group(1).lower() if match else None
+
+
+def normalize_doi(text: str) -> Optional[str]:
+    """提取 DOI（小写，去掉末尾标点）"""
+    match = DOI_RE.search(text)
+    if not match:
+        return None
+    return match.group(1).rstrip('.,;)]}').lower()
+
+
+def title_fingerprint(title: str) -> Optional[str]:
+    """标题指纹：去重音、小写、只保留字母数字、去停用词后取哈希"""
+    if not title:
+        return None
+    text = unicodedata.normalize('NFKD', title)
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    words = [w for w in re.findall(r'[a-z0-9]+|[一-鿿]', text) if w not in TITLE_STOPWORDS]
+    if len(words) < 3:
+        return None
+    return hashlib.sha1(' '.join(words).encode('utf-8')).hexdigest()[:16]
+
+
+def guess_title(entry: str) -> Optional[str]:
+    """
+    从参考文献条目中猜测标题
+
+    优先使用引号中的内容；其次识别缩写作者列表（Surname, I. / I. Surname / Surname I），
+    取其后的第一句；否则按 ". " 切分，取作者列表之后的第一段
+    """
+    match = QUOTED_TITLE_RE.search(entry)
+    if match:
+        return match.group(1).strip(' ,.')
+
+    text = re.sub(r'https?://\S+', '', entry)
+    authors = AUTHOR_LIST_RE.match(text)
+    if authors:
+        rest = text[authors.end():]
+        rest = rest[LEADING_YEAR_RE.match(rest).end():]
+        title = SENTENCE_SPLIT_RE.split(rest, maxsplit=1)[0].strip(' ,.')
+        # 识别出作者列表后，其后的第一句就是标题，即使很短也不再回退到期刊/会议段
+        if title and not YEAR_RE.fullmatch(title.strip('() ')):
+            return title
+
+    parts = [p.strip() for p in SENTENCE_SPLIT_RE.split(text) if p.strip()]
+    for part in parts[1:]:
+        words = part.split()
+        # 跳过年份和过短的片段
+        if len(words) >= 3 and not YEAR_RE.fullmatch(part.strip('() ')):
+            return part.strip(' ,.')
+    return parts[0].strip(' ,.') if parts else None
+
+
+def parse_reference(entry: str) -> Dict[str, Any]:
+    """
+    归一化一条参考文献
+
+    Returns:
+        {"raw", "title", "arxiv", "doi", "keys"}，keys 为用于匹配的归一化键
+    """
+    arxiv = normalize_arxiv(entry)
+    doi = normalize_doi(entry)
+    title = guess_title(entry)
+    fingerprint = title_fingerprint(title)
+
+    keys = []
+    if arxiv:
+        keys.append(f"arxiv:{arxiv}")
+        # arXiv 论文的 DataCite DOI
+        keys.append(f"doi:10.48550/arxiv.{arxiv}")
+    if doi:
+        keys.append(f"doi:{doi}")
+        match = re.match(r'10\.48550/arxiv\.(.+)$', doi)
+        if match:
+            keys.append(f"arxiv:{match.group(1)}")
+    if fingerprint:
+        keys.append(f"title:{fingerprint}")
+
+    return {
+        "raw": entry,
+        "title": title,
+        "arxiv": arxiv,
+        "doi": doi,
+        "keys": list(dict.fromkeys(keys))
+    }
+
+
+def parse_references(markdown: str) -> List[Dict[str, Any]]:
+    """解析 Markdown 中的全部参考文献"""
+    return [parse_reference(entry) for entry in split_references(extract_reference_section(markdown))]
+
+
+def query_keys(query: str) -> List[str]:
+    """将查询（arXiv ID / DOI / 标题）转换为归一化键"""
+    query = query.strip()
+    keys = []
+    arxiv = normalize_arxiv(query) or normalize_arxiv(f"arXiv:{query}")
+    if arxiv:
+        keys += [f"arxiv:{arxiv}", f"doi:10.48550/arxiv.{arxiv}"]
+    doi = normalize_doi(query)
+    if doi:
+        keys.append(f"doi:{doi}")
+    fingerprint = title_fingerprint(query)
+    if fingerprint and not keys:
+        keys.append(f"title:{fingerprint}")
+    return keys
+
+
+def guess_paper_title(markdown: str) -> Optional[str]:
+    """论文标题：第一个 Markdown 标题"""
+    for line in markdown.splitlines():
+        match = HEADING_RE.match(line)
+        if match:
+            return match.group(2).strip()
+    return None
+
+
+class CitationIndex:
+    """SQLite 引用图索引，每个进程/线程持有自己的连接"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or DEFAULT_CITATION_DB
+        db_dir = os.path.dirname(os.path.abspath(self.db_path))
+        os.makedirs(db_dir, exist_ok=True)
+
+        self.conn = sqlite3.connect(self.db_path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def index_paper(self, paper_id: str, markdown: str, arxiv_id: Optional[str] = None,
+                    doi: Optional[str] = None, title: Optional[str] = None,
+                    source_path: Optional[str] = None, source_stat: Optional[os.stat_result] = None) -> bool:
+        """
+        索引一篇论文；内容哈希未变化时只补充论文自身的标识键，不重新解析参考文献
+
+        arxiv_id / doi 属于论文本身而不是内容，重新索引时保留之前记录的值，
+        因此先由 scan 按 uuid 索引、之后再带 arxiv_id 解析的论文也能被匹配。
+
+        Args:
+            paper_id: 论文唯一标识（与 paper_<id>.md 一致）
+            markdown: MinerU 输出的 Markdown
+            arxiv_id / doi / title: 论文自身的标识，用于被其他论文的参考文献匹配
+
+        Returns:
+            是否重新索引
+        """
+        id_keys = []
+        if arxiv_id:
+            arxiv_id = normalize_arxiv(f"arXiv:{arxiv_id}") or arxiv_id.lower()
+            id_keys += [f"arxiv:{arxiv_id}", f"doi:10.48550/arxiv.{arxiv_id}"]
+        if doi:
+            id_keys.append(f"doi:{normalize_doi(doi) or doi.lower()}")
+
+        content_hash = hashlib.sha256(markdown.encode('utf-8')).hexdigest()
+        row = self.conn.execute(
+            "SELECT content_hash FROM papers WHERE id = ?", (paper_id,)
+        ).fetchone()
+        if row and row['content_hash'] == content_hash:
+            with self.conn:
+                self._add_keys(paper_id, id_keys)
+                if source_stat is not None:
+                    self._update_source(paper_id, source_path, source_stat)
+            return False
+
+        previous_keys = [
+            r['key'] for r in self.conn.execute(
+                "SELECT key FROM paper_keys WHERE paper_id = ? AND key NOT LIKE 'title:%'", (paper_id,)
+            )
+        ]
+        title = title or guess_paper_title(markdown)
+        fingerprint = title_fingerprint(title)
+        own_keys = previous_keys + id_keys + ([f"title:{fingerprint}"] if fingerprint else [])
+
+        references = parse_references(markdown)
+        with self.conn:
+            self._delete(paper_id)
+            self.conn.execute(
+                "INSERT INTO papers (id, title, content_hash, ref_count, indexed_at) VALUES (?, ?, ?, ?, ?)",
+                (paper_id, title, content_hash, len(references), time.time())
+            )
+            if source_stat is not None:
+                self._update_source(paper_id, source_path, source_stat)
+            self._add_keys(paper_id, own_keys)
+            self.conn.executemany(
+                "INSERT INTO refs (paper_id, idx, raw, title, arxiv, doi) VALUES (?, ?, ?, ?, ?, ?)",
+                [(paper_id, i, r['raw'], r['title'], r['arxiv'], r['doi']) for i, r in enumerate(references)]
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO ref_keys (key, paper_id, idx) VALUES (?, ?, ?)",
+                [(key, paper_id, i) for i, r in enumerate(references) for key in r['keys']]
+            )
+        return True
+
+    def _add_keys(self, paper_id: str, keys: List[str]):
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO paper_keys (key, paper_id) VALUES (?, ?)",
+            [(key, paper_id) for key in dict.fromkeys(keys)]
+        )
+
+    def _update_source(self, paper_id: str, source_path: Optional[str], st: os.stat_result):
+        self.conn.execute(
+            "UPDATE papers SET source_path = ?, source_mtime = ?, source_size = ? WHERE id = ?",
+            (source_path, st.st_mtime, st.st_size, paper_id)
+        )
+
+    def _delete(self, paper_id: str):
+        for table in ('papers', 'paper_keys', 'refs', 'ref_keys'):
+            column = 'id' if table == 'papers' else 'paper_id'
+            self.conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (paper_id,))
+
+    def remove_paper(self, paper_id: str):
+        """从索引中删除论文"""
+        with self.conn:
+            self._delete(paper_id)
+
+    def scan(self, directory: str, prune: bool = False) -> Dict[str, int]:
+        """
+        增量扫描目录中的 paper_<id>.md：文件 mtime/size 未变时不读取
+
+        Args:
+            directory: MinerU 输出目录
+            prune: 删除索引中对应文件已不存在的论文
+
+        Returns:
+            {"indexed", "unchanged", "removed"}
+        """
+        known = {
+            row['id']: row for row in self.conn.execute(
+                "SELECT id, source_path, source_mtime, source_size FROM papers"
+            )
+        }
+        stats = {"indexed": 0, "unchanged": 0, "removed": 0}
+        seen = set()
+        for path in sorted(glob.glob(os.path.join(directory, 'paper_*.md'))):
+            paper_id = os.path.basename(path)[len('paper_'):-len('.md')]
+            seen.add(paper_id)
+            st = os.stat(path)
+            row = known.get(paper_id)
+            if row and row['source_path'] == path and row['source_mtime'] == st.st_mtime \
+                    and row['source_size'] == st.st_size:
+                stats["unchanged"] += 1
+                continue
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                markdown = f.read()
+            arxiv_id = paper_id if normalize_arxiv(f"arXiv:{paper_id}") == paper_id else None
+            if self.index_paper(paper_id, markdown, arxiv_id=arxiv_id, source_path=path, source_stat=st):
+                stats["indexed"] += 1
+            else:
+                stats["unchanged"] += 1
+
+        if prune:
+            for paper_id, row in known.items():
+                if paper_id not in seen and row['source_path'] \
+                        and os.path.dirname(row['source_path']) == os.path.normpath(directory):
+                    self.remove_paper(paper_id)
+                    stats["removed"] += 1
+        return stats
+
+    def resolve(self, query: str) -> List[str]:
+        """将查询解析为归一化键：库中论文 ID 使用其自身标识，否则按 arXiv/DOI/标题解析"""
+        rows = self.conn.execute("SELECT key FROM paper_keys WHERE paper_id = ?", (query,)).fetchall()
+        if rows:
+            return [row['key'] for row in rows]
+        return query_keys(query)
+
+    def cited_by(self, query: str) -> List[Dict[str, Any]]:
+        """库中引用了 X 的论文"""
+        keys = self.resolve(query)
+        if not keys:
+            return []
+        placeholders = ','.join('?' * len(keys))
+        rows = self.conn.execute(
+            f"SELECT p.id, p.title, r.idx, r.raw FROM ref_keys k "
+            f"JOIN papers p ON p.id = k.paper_id "
+            f"JOIN refs r ON r.paper_id = k.paper_id AND r.idx = k.idx "
+            f"WHERE k.key IN ({placeholders}) AND k.paper_id != ? "
+            f"GROUP BY p.id ORDER BY p.id",
+            (*keys, query)
+        ).fetchall()
+        return [{"paper_id": r['id'], "title": r['title'], "ref_index": r['idx'], "reference": r['raw']}
+                for r in rows]
+
+    def shared_references(self, paper_a: str, paper_b: str) -> List[Dict[str, Any]]:
+        """A 和 B 的共同参考文献"""
+        rows = self.conn.execute(
+            "SELECT ra.idx AS idx_a, MIN(rb.idx) AS idx_b, ra.raw, ra.title, ra.arxiv, ra.doi "
+            "FROM ref_keys ka JOIN ref_keys kb ON ka.key = kb.key "
+            "JOIN refs ra ON ra.paper_id = ka.paper_id AND ra.idx = ka.idx "
+            "JOIN refs rb ON rb.paper_id = kb.paper_id AND rb.idx = kb.idx "
+            "WHERE ka.paper_id = ? AND kb.paper_id = ? "
+            "GROUP BY ra.idx ORDER BY ra.idx",
+            (paper_a, paper_b)
+        ).fetchall()
+        return [{"index_a": r['idx_a'], "index_b": r['idx_b'], "reference": r['raw'],
+                 "title": r['title'], "arxiv": r['arxiv'], "doi": r['doi']} for r in rows]
+
+    def references(self, paper_id: str) -> List[Dict[str, Any]]:
+        """论文的参考文献，并标注库中对应的论文"""
+        rows = self.conn.execute(
+            "SELECT r.idx, r.raw, r.title, r.arxiv, r.doi, "
+            "(SELECT GROUP_CONCAT(DISTINCT pk.paper_id) FROM ref_keys k "
+            " JOIN paper_keys pk ON pk.key = k.key "
+            " WHERE k.paper_id = r.paper_id AND k.idx = r.idx AND pk.paper_id != r.paper_id) AS in_library "
+            "FROM refs r WHERE r.paper_id = ? ORDER BY r.idx",
+            (paper_id,)
+        ).fetchall()
+        return [{"index": r['idx'], "reference": r['raw'], "title": r['title'], "arxiv": r['arxiv'],
+                 "doi": r['doi'], "in_library": r['in_library'].split(',') if r['in_library'] else []}
+                for r in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        """索引规模"""
+        papers = self.conn.execute("SELECT COUNT(*) AS n FROM papers").fetchone()['n']
+        refs = self.conn.execute("SELECT COUNT(*) AS n FROM refs").fetchone()['n']
+        edges = self.conn.execute(
+            "SELECT COUNT(DISTINCT k.paper_id || '>' || pk.paper_id) AS n FROM ref_keys k "
+            "JOIN paper_keys pk ON pk.key = k.key WHERE pk.paper_id != k.paper_id"
+        ).fetchone()['n']
+        return {"papers": papers, "references": refs, "library_citations": edges}
+
+
+def update_citation_index(paper_id: str, markdown: str, arxiv_id: Optional[str] = None,
+                          db_path: Optional[str] = None) -> bool:
+    """解析完成后增量更新引用图索引；失败只输出错误，不影响解析结果"""
+    try:
+        index = CitationIndex(db_path)
+        try:
+            index.index_paper(paper_id, markdown, arxiv_id=arxiv_id)
+        finally:
+            index.close()
+        return True
+    except Exception as e:
+        print(f"引用索引更新失败 ({paper_id}): {str(e)}", file=sys.stderr)
+        return False
+
+
+def selfcheck() -> List[str]:
+    """
+    检查标题解析和共同参考文献匹配
+
+    Returns:
+        失败信息列表，为空表示全部通过
+    """
+    failures = []
+    for entry, expected in TITLE_SAMPLES:
+        title = guess_title(entry)
+        if title != expected:
+            failures.append(f"标题解析错误: {entry!r} -> {title!r}")
+
+    # 不同格式（APA / Vancouver）引用同一论文，应匹配为共同参考文献
+    index = CitationIndex(':memory:')
+    try:
+        index.index_paper('a', "# A\n\n## References\n[1] " + TITLE_SAMPLES[2][0])
+        index.index_paper('b', "# B\n\n## References\n1. " + TITLE_SAMPLES[5][0])
+        if len(index.shared_references('a', 'b')) != 1:
+            failures.append("共同参考文献匹配失败: APA / Vancouver 格式的 ResNet")
+    finally:
+        index.close()
+    return failures
+
+
+# CLI 入口
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="论文库引用图索引")
+    parser.add_argument("--db", type=str, help="索引数据库路径")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_scan = sub.add_parser("scan", help="增量索引目录中的 paper_<id>.md")
+    p_scan.add_argument("directory", nargs="?", default="/tmp")
+    p_scan.add_argument("--prune", action="store_true", help="删除文件已不存在的论文")
+
+    p_add = sub.add_parser("add", help="索引单个 Markdown 文件")
+    p_add.add_argument("file")
+    p_add.add_argument("--id", type=str, help="论文 ID，默认取文件名")
+    p_add.add_argument("--arxiv", type=str, help="论文的 arXiv ID")
+    p_add.add_argument("--doi", type=str, help="论文的 DOI")
+
+    p_cited = sub.add_parser("cited-by", help="库中引用了 X 的论文")
+    p_cited.add_argument("query", help="论文 ID / arXiv ID / DOI / 标题")
+
+    p_shared = sub.add_parser("shared", help="两篇论文的共同参考文献")
+    p_shared.add_argument("paper_a")
+    p_shared.add_argument("paper_b")
+
+    p_refs = sub.add_parser("refs", help="论文的参考文献")
+    p_refs.add_argument("paper_id")
+
+    sub.add_parser("stats", help="索引规模")
+    sub.add_parser("selfcheck", help="检查 IEEE / APA / ACL / Vancouver 参考文献的标题解析")
+
+    args = parser.parse_args()
+
+    if args.command == "selfcheck":
+        failures = selfcheck()
+        for failure in failures:
+            print(failure)
+        print(f"{len(TITLE_SAMPLES)} 个样例, {len(failures)} 个失败")
+        sys.exit(1 if failures else 0)
+
+    index = CitationIndex(args.db)
+
+    start = time.perf_counter()
+    if args.command == "scan":
+        result = index.scan(args.directory, prune=args.prune)
+    elif args.command == "add":
+        paper_id = args.id or os.path.splitext(os.path.basename(args.file))[0].replace('paper_', '', 1)
+        with open(args.file, 'r', encoding='utf-8') as f:
+            changed = index.index_paper(paper_id, f.read(), arxiv_id=args.arxiv, doi=args.doi)
+        result = {"paper_id": paper_id, "indexed": changed}
+    elif args.command == "cited-by":
+        result = index.cited_by(args.query)
+    elif args.command == "shared":
+        result = index.shared_references(args.paper_a, args.paper_b)
+    elif args.command == "refs":
+        result = index.references(args.paper_id)
+    else:
+        result = index.stats()
+    elapsed = (time.perf_counter() - start) * 1000
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    print(f"耗时: {elapsed:.1f} ms")
+    index.close()
@@ -10,8 +10,13 @@ import time
 import requests
 import zipfile
 import io
+import hashlib
+import threading
 from typing import Optional, Dict, Any
 
+from work_queue import WorkQueue, default_worker_id
+from citation_index import update_citation_index
+
 # Token 文件路径
 TOKEN_FILE = os.path.join(os.path.dirname(__file__), '..', 'config', 'mineru_token.txt')
 
@@ -290,7 +295,7 @@ def parse_local_file(file_path: str, token: Optional[str] = None, output_dir: Op
         return {"success": False, "error": f"错误: {str(e)}"}
 
 
-def parse_local_file(file_path: str, token: Optional[str] = None, output_dir: Optional[str] = None) -> Dict[str, Any]:
+def parse_local_file(file_path: str, token: Optional[str] = None, output_dir: Optional[str] = None, output_id: Optional[str] = None) -> Dict[str, Any]:
     """
     解析本地 PDF 文件
     
@@ -298,6 +303,7 @@ def parse_local_file(file_path: str, token: Optional[str] = None, output_dir: Op
         file_path: 本地 PDF 文件路径
         token: MinerU API Token
         output_dir: 输出目录
+        output_id: 输出唯一标识
     
     Returns:
         解析结果字典
@@ -386,6 +392,14 @@ def parse_local_file(file_path: str, token: Optional[str] = None, output_dir: Op
                     if state == "done":
                         # 返回 markdown
                         markdown = check_data["data"].get("markdown", "")
+                        
+                        # 保存 markdown - 使用 output_id 唯一定位
+                        if output_dir and output_id:
+                            os.makedirs(output_dir, exist_ok=True)
+                            output_file = os.path.join(output_dir, f"paper_{output_id}.md")
+                            with open(output_file, 'w', encoding='utf-8') as f:
+                                f.write(markdown)
+                        
                         return {
                             "success": True,
                             "data": {
@@ -426,6 +440,134 @@ def parse_arxiv(arxiv_id: str, token: Optional[str] = None, output_dir: Optional
     pdf_url = f"https://arxiv.org/pdf/{arxiv_id}.pdf"
     return parse_url(pdf_url, token, output_dir, output_id)
 
+def default_output_id(arxiv_id: Optional[str] = None, pdf_url: Optional[str] = None,
+                      file_path: Optional[str] = None) -> str:
+    """
+    未指定 --uuid 时的输出标识：arXiv ID、URL 哈希或本地文件内容哈希，
+    保证不同论文不会写入同一个 paper_<id>.md / 索引条目
+    """
+    if arxiv_id:
+        return arxiv_id
+    if pdf_url:
+        return "url_" + hashlib.sha256(pdf_url.encode('utf-8')).hexdigest()[:16]
+    if file_path:
+        digest = hashlib.sha256()
+        try:
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+        except OSError:
+            digest.update(os.path.abspath(file_path).encode('utf-8'))
+        return "file_" + digest.hexdigest()[:16]
+    return "paper"
+
+def run_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    执行一个队列任务
+
+    Args:
+        job: WorkQueue.lease() 返回的任务，kind 为 arxiv / url / file
+
+    Returns:
+        解析结果字典
+    """
+    payload = job["payload"]
+    output_dir = payload.get("output") or "/tmp"
+    output_id = payload.get("uuid") or default_output_id(payload.get("arxiv"), payload.get("url"), payload.get("file"))
+    kind = job["kind"]
+
+    if kind == "arxiv":
+        result = parse_arxiv(payload["arxiv"], output_dir=output_dir, output_id=output_id)
+    elif kind == "url":
+        result = parse_url(payload["url"], output_dir=output_dir, output_id=output_id)
+    elif kind == "file":
+        result = parse_local_file(payload["file"], output_dir=output_dir, output_id=output_id)
+    else:
+        return {"success": False, "error": f"未知任务类型: {kind}"}
+
+    if result.get("success"):
+        update_citation_index(output_id, result["data"].get("markdown", ""), payload.get("arxiv"))
+    return result
+
+def run_worker(queue_db: Optional[str] = None, worker_id: Optional[str] = None,
+               poll_interval: float = 2.0, max_jobs: Optional[int] = None,
+               exit_when_empty: bool = False) -> int:
+    """
+    队列 worker：循环领取任务并解析，解析期间后台线程定期心跳续约
+
+    可以在同一台机器上启动多个 worker 进程，共享同一个 queue_db 文件（不支持跨机器共享）。
+
+    Args:
+        queue_db: 队列数据库路径
+        worker_id: worker 标识，默认 主机名:进程号
+        poll_interval: 队列为空时的轮询间隔（秒）
+        max_jobs: 处理多少个任务后退出，None 表示不限
+        exit_when_empty: 队列中没有未完成任务时退出
+
+    Returns:
+        处理的任务数
+    """
+    queue = WorkQueue(queue_db)
+    worker_id = worker_id or default_worker_id()
+    heartbeat_interval = max(queue.visibility_timeout / 3, 1)
+    processed = 0
+
+    try:
+        while max_jobs is None or processed < max_jobs:
+            job = queue.lease(worker_id)
+            if job is None:
+                # 仍有延迟重试或其他 worker 持有的任务时继续等待
+                if exit_when_empty and queue.depth() == 0:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            print(f"[{worker_id}] 领取任务 #{job['id']} ({job['kind']}, 第 {job['attempts']} 次)")
+
+            # 心跳线程使用独立连接（sqlite3 连接不能跨线程共享）
+            stop = threading.Event()
+            def beat(job_id=job["id"]):
+                hb_queue = WorkQueue(queue.db_path, visibility_timeout=queue.visibility_timeout)
+                try:
+                    while not stop.wait(heartbeat_interval):
+                        if not hb_queue.heartbeat(job_id, worker_id):
+                            print(f"[{worker_id}] 任务 #{job_id} 租约已丢失")
+                            break
+                finally:
+                    hb_queue.close()
+            hb_thread = threading.Thread(target=beat, daemon=True)
+            hb_thread.start()
+
+            try:
+                result = run_job(job)
+            except Exception as e:
+                result = {"success": False, "error": f"错误: {str(e)}"}
+            finally:
+                stop.set()
+                hb_thread.join()
+
+            if result.get("success"):
+                markdown = result.get("data", {}).get("markdown", "")
+                completed = queue.complete(job["id"], worker_id, {
+                    "markdown_length": len(markdown),
+                    "task_id": result.get("data", {}).get("task_id")
+                })
+                if completed:
+                    print(f"[{worker_id}] 任务 #{job['id']} 完成, Markdown 长度: {len(markdown)}")
+                else:
+                    print(f"[{worker_id}] 任务 #{job['id']} 租约已丢失, 结果未提交")
+            else:
+                state = queue.fail(job["id"], worker_id, result.get("error", "解析失败"))
+                if state:
+                    print(f"[{worker_id}] 任务 #{job['id']} 失败: {result.get('error')} -> {state}")
+                else:
+                    print(f"[{worker_id}] 任务 #{job['id']} 失败: {result.get('error')}, 租约已丢失")
+            processed += 1
+    finally:
+        queue.close()
+
+    return processed
+
 # CLI 入口
 if __name__ == "__main__":
     import argparse
@@ -437,6 +579,14 @@ if __name__ == "__main__":
     parser.add_argument("--file", type=str, help="本地 PDF 文件路径")
     parser.add_argument("--output", type=str, default="/tmp", help="输出目录")
     parser.add_argument("--uuid", type=str, help="论文唯一标识")
+    # 任务队列
+    parser.add_argument("--queue-db", type=str, help="队列数据库路径（多个 worker 共享）")
+    parser.add_argument("--enqueue", action="store_true", help="只把 --arxiv/--url/--file 任务放入队列")
+    parser.add_argument("--worker", action="store_true", help="以 worker 模式从队列领取任务")
+    parser.add_argument("--max-jobs", type=int, help="worker 处理多少个任务后退出")
+    parser.add_argument("--exit-when-empty", action="store_true", help="队列为空时 worker 退出")
+    parser.add_argument("--queue-stats", action="store_true", help="输出队列深度和吞吐量")
+    parser.add_argument("--requeue-dead", action="store_true", help="将死信任务重新入队")
     
     args = parser.parse_args()
     
@@ -448,14 +598,46 @@ if __name__ == "__main__":
             sys.exit(1)
     
     # 使用 uuid 生成唯一的输出文件名和图片目录
-    output_id = args.uuid if args.uuid else (args.arxiv or "paper")
+    output_id = args.uuid if args.uuid else default_output_id(args.arxiv, args.url, args.file)
     args.output = args.output or "/tmp"
     
+    # 队列模式
+    if args.worker:
+        count = run_worker(args.queue_db, max_jobs=args.max_jobs, exit_when_empty=args.exit_when_empty)
+        print(f"worker 退出, 共处理 {count} 个任务")
+        sys.exit(0)
+    
+    if args.queue_stats or args.requeue_dead:
+        queue = WorkQueue(args.queue_db)
+        if args.requeue_dead:
+            print(f"已重新入队 {queue.requeue_dead()} 个死信任务")
+        if args.queue_stats:
+            print(json.dumps(queue.stats(), ensure_ascii=False, indent=2))
+        queue.close()
+        sys.exit(0)
+    
+    if args.enqueue:
+        if args.file:
+            kind, payload = "file", {"file": os.path.abspath(args.file)}
+        elif args.arxiv:
+            kind, payload = "arxiv", {"arxiv": args.arxiv}
+        elif args.url:
+            kind, payload = "url", {"url": args.url}
+        else:
+            print("缺少 --arxiv/--url/--file 参数")
+            sys.exit(1)
+        payload.update({"output": args.output, "uuid": output_id})
+        queue = WorkQueue(args.queue_db)
+        job_id = queue.enqueue(kind, payload, dedupe_key=f"{kind}:{args.uuid or payload[kind]}")
+        queue.close()
+        print(json.dumps({"success": True, "job_id": job_id}))
+        sys.exit(0)
+    
     # 执行解析
     result = None
     if args.file:
         print(f"正在解析本地文件: {args.file} ...")
-        result = parse_local_file(args.file, output_dir=args.output)
+        result = parse_local_file(args.file, output_dir=args.output, output_id=output_id)
     elif args.arxiv:
         print(f"正在解析 arXiv: {args.arxiv} ...")
         result = parse_arxiv(args.arxiv, output_dir=args.output, output_id=output_id)
@@ -475,6 +657,7 @@ if __name__ == "__main__":
             print(f"解析成功! Markdown 长度: {len(result['data']['markdown'])}")
             if args.output:
                 print(f"已保存到: {args.output}/paper_{output_id}.md")
+            update_citation_index(output_id, result["data"]["markdown"], args.arxiv)
         else:
             print(f"解析失败: {result.get('error')}")
     else:
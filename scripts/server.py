@@ -5,15 +5,26 @@ MinerU PDF 解析 API 服务
 """
 
 import os
+import re
+import gzip
 import json
+import hashlib
+import threading
 import requests
 import argparse
-from flask import Flask, request, jsonify, send_from_directory
+from collections import OrderedDict
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
+from citation_index import CitationIndex, update_citation_index
 import uuid
 import tempfile
 import shutil
 
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，缺失时只提供 gzip
+    brotli = None
+
 app = Flask(__name__)
 CORS(app)
 
@@ -21,6 +32,17 @@ CORS(app)
 MINERU_API_URL = "https://api.mineru.cn/v1/file/analyze"
 MINERU_API_URL_BATCH = "https://api.mineru.cn/v1/file/batch-analyze"
 
+# 解析结果存放目录，与 mineru_client.py 的 --output 默认值一致 (paper_<id>.md)
+CONTENT_DIR = os.environ.get('PAPER_CONTENT_DIR', '/tmp')
+CONTENT_CHUNK_SIZE = 64 * 1024   # 流式响应分块大小
+CONTENT_MIN_COMPRESS = 1024      # 小于该大小不压缩
+CONTENT_CACHE_SIZE = 32          # 内存中缓存的文档数
+CONTENT_ID_RE = re.compile(r'^[\w.\-]{1,128}$')
+HEADING_RE = re.compile(r'^(#{1,6})\s+(.+?)\s*#*\s*$')
+
+_content_cache = OrderedDict()
+_content_lock = threading.Lock()
+
 # 从文件读取 token
 def get_mineru_token():
     token_file = os.path.join(os.path.dirname(__file__), '..', 'config', 'mineru_token.txt')
@@ -110,6 +132,176 @@ def get_arxiv_pdf_url(arxiv_id):
     # arXiv PDF URL
     return f"https://arxiv.org/pdf/{arxiv_id}.pdf"
 
+def content_path(content_id):
+    """解析结果文件路径；content_id 非法时返回 None"""
+    if not content_id or not CONTENT_ID_RE.match(content_id) or content_id.startswith('.'):
+        return None
+    return os.path.join(CONTENT_DIR, f"paper_{content_id}.md")
+
+def save_content(content_id, markdown):
+    """保存解析结果，先写临时文件再替换，避免读到半个文件"""
+    path = content_path(content_id)
+    if not path:
+        return None
+    os.makedirs(CONTENT_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    body = markdown.encode('utf-8')
+    with open(tmp_path, 'wb') as f:
+        f.write(body)
+    os.replace(tmp_path, path)
+    # 直接用写入的内容刷新缓存，不依赖 mtime 精度判断文件是否变化
+    return cache_content(path, content_stat_key(os.stat(path)), body)
+
+def split_sections(body):
+    """
+    按 Markdown 标题切分章节（跳过代码块中的 #）
+
+    Returns:
+        [{"index", "title", "level", "offset", "length"}]，offset/length 为 UTF-8 字节位置
+    """
+    sections = []
+    offset = 0
+    in_fence = False
+    for line in body.splitlines(keepends=True):
+        text = line.decode('utf-8', errors='replace')
+        if text.lstrip().startswith('```'):
+            in_fence = not in_fence
+        match = None if in_fence else HEADING_RE.match(text)
+        if match or not sections:
+            sections.append({
+                "index": len(sections),
+                "title": match.group(2) if match else "",
+                "level": len(match.group(1)) if match else 0,
+                "offset": offset
+            })
+        offset += len(line)
+    for i, sec in enumerate(sections):
+        end = sections[i + 1]["offset"] if i + 1 < len(sections) else len(body)
+        sec["length"] = end - sec["offset"]
+    return sections
+
+def content_stat_key(st):
+    """缓存校验键：inode + mtime + size（os.replace 写入会更换 inode）"""
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+def cache_content(path, key, body):
+    """生成缓存条目（正文、ETag、章节索引、压缩结果）并放入缓存"""
+    entry = {
+        "key": key,
+        "body": body,
+        "etag": hashlib.sha256(body).hexdigest()[:32],
+        "sections": split_sections(body),
+        "encoded": {}
+    }
+    with _content_lock:
+        _content_cache[path] = entry
+        _content_cache.move_to_end(path)
+        while len(_content_cache) > CONTENT_CACHE_SIZE:
+            _content_cache.popitem(last=False)
+    return entry
+
+def load_content(content_id):
+    """
+    读取解析结果；由 save_content 写入的内容直接命中缓存，
+    其他进程写入的文件按 (inode, mtime, size) 判断是否需要重新读取
+
+    Returns:
+        缓存条目字典；文件不存在时返回 None
+    """
+    path = content_path(content_id)
+    if not path:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+
+    key = content_stat_key(st)
+    with _content_lock:
+        entry = _content_cache.get(path)
+        if entry and entry["key"] == key:
+            _content_cache.move_to_end(path)
+            return entry
+
+    with open(path, 'rb') as f:
+        body = f.read()
+    return cache_content(path, key, body)
+
+def choose_encoding(accept_encoding, size):
+    """根据 Accept-Encoding 选择压缩方式: br > gzip > identity"""
+    if size < CONTENT_MIN_COMPRESS:
+        return None
+    if brotli is not None and accept_encoding['br']:
+        return 'br'
+    if accept_encoding['gzip']:
+        return 'gzip'
+    return None
+
+def encode_body(entry, name, body, encoding):
+    """压缩正文，同一版本内容的压缩结果缓存在条目中"""
+    if encoding is None:
+        return body
+    cache_key = (name, encoding)
+    encoded = entry["encoded"].get(cache_key)
+    if encoded is None:
+        if encoding == 'br':
+            encoded = brotli.compress(body, quality=5)
+        else:
+            encoded = gzip.compress(body, compresslevel=6, mtime=0)
+        entry["encoded"][cache_key] = encoded
+    return encoded
+
+def iter_chunks(data):
+    """分块输出响应体（不设 Content-Length，以 chunked 方式传输）"""
+    for i in range(0, len(data), CONTENT_CHUNK_SIZE):
+        yield data[i:i + CONTENT_CHUNK_SIZE]
+
+def content_response(entry, name, body, base_etag, content_type='text/markdown; charset=utf-8'):
+    """
+    条件请求 + 压缩协商 + Range 的通用响应
+
+    每种编码对应独立的强 ETag（<hash>、<hash>-gzip、<hash>-br），
+    If-None-Match 与本次协商出的表示的 ETag 一致时返回 304。
+    """
+    # Range 只处理单个范围，且只对未压缩表示生效；多个范围或 If-Range 与当前版本
+    # 不一致时忽略 Range，返回完整内容
+    byte_range = request.range
+    if byte_range is not None and (len(byte_range.ranges) != 1
+                                   or request.if_range.etag not in (None, base_etag)):
+        byte_range = None
+
+    encoding = None if byte_range is not None else choose_encoding(request.accept_encodings, len(body))
+    etag = f"{base_etag}-{encoding}" if encoding else base_etag
+
+    # If-None-Match 使用弱比较 (RFC 9110)，代理弱化后的 W/"..." 也能命中
+    if request.if_none_match.contains_weak(etag):
+        resp = Response(status=304)
+        resp.set_etag(etag)
+        resp.headers['Cache-Control'] = 'no-cache'
+        resp.headers['Vary'] = 'Accept-Encoding'
+        return resp
+
+    if byte_range is not None:
+        span = byte_range.range_for_length(len(body))
+        if span is None:
+            resp = Response(status=416)
+            resp.headers['Content-Range'] = f"bytes */{len(body)}"
+            return resp
+        start, stop = span
+        resp = Response(iter_chunks(body[start:stop]), status=206, content_type=content_type)
+        resp.headers['Content-Range'] = f"bytes {start}-{stop - 1}/{len(body)}"
+    else:
+        payload = encode_body(entry, name, body, encoding)
+        resp = Response(iter_chunks(payload), content_type=content_type)
+        if encoding:
+            resp.headers['Content-Encoding'] = encoding
+    resp.set_etag(etag)
+
+    resp.headers['Accept-Ranges'] = 'bytes'
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['Vary'] = 'Accept-Encoding'
+    return resp
+
 @app.route('/api/parse', methods=['POST'])
 def parse_paper():
     """解析论文 API"""
@@ -146,8 +338,95 @@ def parse_paper():
     else:
         return jsonify({"success": False, "error": f"未知的 sourceType: {source_type}"})
     
+    # 保存 Markdown，之后通过 /api/content/<id> 按需获取（支持 ETag / 压缩 / Range）
+    payload = result.get("data") if result.get("success") else None
+    markdown = payload.get("markdown") if isinstance(payload, dict) else None
+    if isinstance(markdown, str):
+        content_id = data.get('uuid') or hashlib.sha256(markdown.encode('utf-8')).hexdigest()[:16]
+        entry = save_content(content_id, markdown)
+        if entry:
+            # 只索引已保存、可通过 /api/content 访问的论文；索引失败不影响解析结果
+            update_citation_index(content_id, markdown, source if source_type == 'arxiv' else None)
+            result["content"] = {
+                "id": content_id,
+                "url": f"/api/content/{content_id}",
+                "etag": entry["etag"],
+                "length": len(entry["body"])
+            }
+            # inline=false 时不在响应中重复返回 Markdown 正文
+            if data.get('inline') is False:
+                result["data"] = {k: v for k, v in payload.items() if k != "markdown"}
+    
     return jsonify(result)
 
+@app.route('/api/content/<content_id>', methods=['GET'])
+def get_content(content_id):
+    """
+    获取解析结果 Markdown
+
+    参数:
+        section: 只返回第 N 个章节
+        toc=1: 返回章节目录（标题、字节位置）
+    支持 If-None-Match (304)、gzip/br 压缩、Range 字节范围和分块传输。
+    """
+    entry = load_content(content_id)
+    if entry is None:
+        return jsonify({"success": False, "error": "内容不存在"}), 404
+
+    if request.args.get('toc'):
+        toc = json.dumps({"success": True, "etag": entry["etag"], "sections": entry["sections"]},
+                         ensure_ascii=False).encode('utf-8')
+        return content_response(entry, 'toc', toc, f"{entry['etag']}-toc",
+                                content_type='application/json')
+
+    section = request.args.get('section')
+    if section is not None:
+        try:
+            index = int(section)
+            if index < 0:
+                raise IndexError(index)
+            sec = entry["sections"][index]
+        except (ValueError, IndexError):
+            return jsonify({"success": False, "error": f"章节不存在: {section}"}), 404
+        body = entry["body"][sec["offset"]:sec["offset"] + sec["length"]]
+        return content_response(entry, f"section{sec['index']}", body,
+                                f"{entry['etag']}-s{sec['index']}")
+
+    return content_response(entry, 'full', entry["body"], entry["etag"])
+
+@app.route('/api/citations/cited-by', methods=['GET'])
+def citations_cited_by():
+    """库中引用了 X 的论文（q: 论文 ID / arXiv ID / DOI / 标题）"""
+    query = request.args.get('q')
+    if not query:
+        return jsonify({"success": False, "error": "缺少 q 参数"})
+    index = CitationIndex()
+    try:
+        return jsonify({"success": True, "data": index.cited_by(query)})
+    finally:
+        index.close()
+
+@app.route('/api/citations/shared', methods=['GET'])
+def citations_shared():
+    """两篇论文的共同参考文献"""
+    paper_a, paper_b = request.args.get('a'), request.args.get('b')
+    if not paper_a or not paper_b:
+        return jsonify({"success": False, "error": "缺少 a / b 参数"})
+    index = CitationIndex()
+    try:
+        return jsonify({"success": True, "data": index.shared_references(paper_a, paper_b)})
+    finally:
+        index.close()
+
+@app.route('/api/citations/<paper_id>/references', methods=['GET'])
+def citations_references(paper_id):
+    """论文的参考文献，标注库中已有的论文"""
+    index = CitationIndex()
+    try:
+        return jsonify({"success": True, "data": index.references(paper_id)})
+    finally:
+        index.close()
+
 @app.route('/api/token', methods=['POST'])
 def set_token():
     """设置 MinerU token"""
@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""
+基于 SQLite (WAL) 的持久化任务队列
+
+同一台机器上的多个 mineru_client.py worker 进程从同一个队列文件中领取解析任务。
+WAL 模式依赖本机共享内存，租约使用本机时钟，因此队列文件不能放在网络文件系统上
+供多台机器共享。
+
+- 租约 (lease) + 心跳：领取任务后在 visibility_timeout 内不可被其他 worker 看到，
+  worker 需定期 heartbeat 续约；worker 崩溃后租约过期，任务自动重新可见
+- 至少一次投递 (at-least-once)：任务只有在 complete() 后才算完成
+- 死信：失败（或租约过期）达到 max_attempts 次后进入 dead 状态，不再投递
+- stats()：队列深度、各状态数量、最近吞吐量
+"""
+
+import os
+import json
+import time
+import socket
+import sqlite3
+from typing import Optional, Dict, Any, List
+
+# 默认队列文件
+DEFAULT_QUEUE_DB = os.environ.get(
+    'PAPER_QUEUE_DB',
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'parse_queue.db')
+)
+
+# 默认参数
+DEFAULT_VISIBILITY_TIMEOUT = 600  # 秒，单次 MinerU 解析最长约 360 秒
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_DELAY = 10  # 秒，失败后重新可见的基础延迟（按次数线性退避）
+
+# 任务状态
+STATE_QUEUED = 'queued'
+STATE_LEASED = 'leased'
+STATE_DONE = 'done'
+STATE_DEAD = 'dead'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    dedupe_key TEXT,
+    state TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    visible_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    last_error TEXT,
+    result TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_dedupe ON jobs (dedupe_key, state);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (state, visible_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs (state, lease_expires);
+CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (state, finished_at);
+"""
+
+
+def default_worker_id() -> str:
+    """生成 worker 标识：主机名:进程号"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    """SQLite 持久化任务队列，每个进程持有自己的连接"""
+
+    def __init__(self, db_path: Optional[str] = None,
+                 visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 retry_delay: float = DEFAULT_RETRY_DELAY):
+        self.db_path = db_path or DEFAULT_QUEUE_DB
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+        db_dir = os.path.dirname(os.path.abspath(self.db_path))
+        os.makedirs(db_dir, exist_ok=True)
+
+        # isolation_level=None: 由我们自己显式 BEGIN IMMEDIATE 控制事务
+        self.conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=30000")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _write(self):
+        """开启写事务；BEGIN IMMEDIATE 保证领取任务时不会被其他 worker 抢占"""
+        return _Transaction(self.conn)
+
+    def enqueue(self, kind: str, payload: Dict[str, Any],
+                dedupe_key: Optional[str] = None,
+                max_attempts: Optional[int] = None,
+                delay: float = 0) -> Optional[int]:
+        """
+        添加任务
+
+        Args:
+            kind: 任务类型（如 arxiv / url）
+            payload: 任务参数
+            dedupe_key: 去重键，未完成的同键任务已存在时不重复入队
+            max_attempts: 最大尝试次数，超过后进入死信
+            delay: 延迟可见秒数
+
+        Returns:
+            任务 ID；因去重未入队时返回已存在任务的 ID
+        """
+        now = time.time()
+        with self._write():
+            # 去重只针对未完成的任务；已完成或死信的同键任务允许重新提交
+            active = self._active_job(dedupe_key) if dedupe_key else None
+            if active is not None:
+                return active
+            cur = self.conn.execute(
+                "INSERT INTO jobs (kind, payload, dedupe_key, max_attempts, visible_at, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (kind, json.dumps(payload, ensure_ascii=False), dedupe_key,
+                 max_attempts or self.max_attempts, now + delay, now, now)
+            )
+            return cur.lastrowid
+
+    def _active_job(self, dedupe_key: str) -> Optional[int]:
+        """同键的未完成任务 ID"""
+        row = self.conn.execute(
+            "SELECT id FROM jobs WHERE dedupe_key = ? AND state IN (?, ?) LIMIT 1",
+            (dedupe_key, STATE_QUEUED, STATE_LEASED)
+        ).fetchone()
+        return row['id'] if row else None
+
+    def lease(self, worker_id: str, visibility_timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        领取一个可见任务
+
+        可见任务包括：到期的 queued 任务，以及租约已过期的 leased 任务（worker 崩溃）。
+        租约过期且已用完尝试次数的任务会在这里转入死信。
+
+        Returns:
+            任务字典；没有可领取的任务时返回 None
+        """
+        timeout = visibility_timeout or self.visibility_timeout
+        now = time.time()
+        with self._write():
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, finished_at = ?, updated_at = ?, "
+                "last_error = COALESCE(last_error, '租约过期'), lease_owner = NULL "
+                "WHERE state = ? AND lease_expires <= ? AND attempts >= max_attempts",
+                (STATE_DEAD, now, now, STATE_LEASED, now)
+            )
+            row = self.conn.execute(
+                "SELECT * FROM jobs WHERE (state = ? AND visible_at <= ?) "
+                "OR (state = ? AND lease_expires <= ?) ORDER BY visible_at, id LIMIT 1",
+                (STATE_QUEUED, now, STATE_LEASED, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1, lease_owner = ?, "
+                "lease_expires = ?, updated_at = ? WHERE id = ?",
+                (STATE_LEASED, worker_id, now + timeout, now, row['id'])
+            )
+        job = _row_to_job(row)
+        job['state'] = STATE_LEASED
+        job['attempts'] += 1
+        job['lease_owner'] = worker_id
+        job['lease_expires'] = now + timeout
+        return job
+
+    def heartbeat(self, job_id: int, worker_id: str, visibility_timeout: Optional[float] = None) -> bool:
+        """
+        续约；返回 False 表示租约已丢失（过期后被其他 worker 领取）
+        """
+        timeout = visibility_timeout or self.visibility_timeout
+        now = time.time()
+        with self._write():
+            cur = self.conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+                "WHERE id = ? AND state = ? AND lease_owner = ?",
+                (now + timeout, now, job_id, STATE_LEASED, worker_id)
+            )
+            return cur.rowcount == 1
+
+    def complete(self, job_id: int, worker_id: str, result: Optional[Dict[str, Any]] = None) -> bool:
+        """标记任务完成；租约已丢失时返回 False"""
+        now = time.time()
+        with self._write():
+            cur = self.conn.execute(
+                "UPDATE jobs SET state = ?, result = ?, finished_at = ?, updated_at = ?, "
+                "lease_owner = NULL, lease_expires = NULL "
+                "WHERE id = ? AND state = ? AND lease_owner = ?",
+                (STATE_DONE, json.dumps(result, ensure_ascii=False) if result is not None else None,
+                 now, now, job_id, STATE_LEASED, worker_id)
+            )
+            return cur.rowcount == 1
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> Optional[str]:
+        """
+        标记任务失败：未达到最大尝试次数则延迟后重新入队，否则进入死信
+
+        Returns:
+            任务的新状态 (queued / dead)；租约已丢失时返回 None
+        """
+        now = time.time()
+        with self._write():
+            row = self.conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND state = ? AND lease_owner = ?",
+                (job_id, STATE_LEASED, worker_id)
+            ).fetchone()
+            if row is None:
+                return None
+            if row['attempts'] >= row['max_attempts']:
+                self.conn.execute(
+                    "UPDATE jobs SET state = ?, last_error = ?, finished_at = ?, updated_at = ?, "
+                    "lease_owner = NULL, lease_expires = NULL WHERE id = ?",
+                    (STATE_DEAD, error, now, now, job_id)
+                )
+                return STATE_DEAD
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, last_error = ?, visible_at = ?, updated_at = ?, "
+                "lease_owner = NULL, lease_expires = NULL WHERE id = ?",
+                (STATE_QUEUED, error, now + self.retry_delay * row['attempts'], now, job_id)
+            )
+            return STATE_QUEUED
+
+    def requeue_dead(self, job_id: Optional[int] = None) -> int:
+        """
+        将死信任务重新入队（重置尝试次数）；不指定 job_id 时处理全部死信
+
+        同键已有未完成任务的死信不会重新入队；同键的多个死信只重新入队最新的一个。
+        """
+        now = time.time()
+        sql = "SELECT id, dedupe_key FROM jobs WHERE state = ?"
+        params: List[Any] = [STATE_DEAD]
+        if job_id is not None:
+            sql += " AND id = ?"
+            params.append(job_id)
+        sql += " ORDER BY id DESC"
+
+        revived = 0
+        with self._write():
+            claimed = set()
+            for row in self.conn.execute(sql, params).fetchall():
+                key = row['dedupe_key']
+                if key is not None:
+                    if key in claimed or self._active_job(key) is not None:
+                        continue
+                    claimed.add(key)
+                self.conn.execute(
+                    "UPDATE jobs SET state = ?, attempts = 0, visible_at = ?, updated_at = ?, "
+                    "finished_at = NULL WHERE id = ?",
+                    (STATE_QUEUED, now, now, row['id'])
+                )
+                revived += 1
+        return revived
+
+    def depth(self) -> int:
+        """未完成（queued + leased）的任务数，包括延迟重试中的任务"""
+        return self.conn.execute(
+            "SELECT COUNT(*) AS n FROM jobs WHERE state IN (?, ?)", (STATE_QUEUED, STATE_LEASED)
+        ).fetchone()['n']
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """查询任务"""
+        row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def dead_letters(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """列出死信任务"""
+        rows = self.conn.execute(
+            "SELECT * FROM jobs WHERE state = ? ORDER BY finished_at DESC LIMIT ?",
+            (STATE_DEAD, limit)
+        ).fetchall()
+        return [_row_to_job(r) for r in rows]
+
+    def stats(self, window: float = 300) -> Dict[str, Any]:
+        """
+        队列状态报告
+
+        Args:
+            window: 吞吐量统计窗口（秒）
+
+        Returns:
+            各状态数量、队列深度、最老等待时长、窗口内完成数与吞吐量
+        """
+        now = time.time()
+        counts = {s: 0 for s in (STATE_QUEUED, STATE_LEASED, STATE_DONE, STATE_DEAD)}
+        for row in self.conn.execute("SELECT state, COUNT(*) AS n FROM jobs GROUP BY state"):
+            counts[row['state']] = row['n']
+
+        oldest = self.conn.execute(
+            "SELECT MIN(created_at) AS t FROM jobs WHERE state = ?", (STATE_QUEUED,)
+        ).fetchone()['t']
+        recent = self.conn.execute(
+            "SELECT COUNT(*) AS n, AVG(finished_at - created_at) AS latency FROM jobs "
+            "WHERE state = ? AND finished_at >= ?", (STATE_DONE, now - window)
+        ).fetchone()
+        workers = self.conn.execute(
+            "SELECT COUNT(DISTINCT lease_owner) AS n FROM jobs WHERE state = ? AND lease_expires > ?",
+            (STATE_LEASED, now)
+        ).fetchone()['n']
+
+        return {
+            "counts": counts,
+            "depth": counts[STATE_QUEUED] + counts[STATE_LEASED],
+            "active_workers": workers,
+            "oldest_queued_age": round(now - oldest, 1) if oldest else 0,
+            "window": window,
+            "done_in_window": recent['n'],
+            "throughput_per_min": round(recent['n'] * 60.0 / window, 2),
+            "avg_latency": round(recent['latency'], 1) if recent['latency'] is not None else None
+        }
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK 上下文"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+        return False
+
+
+def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+    job = dict(row)
+    job['payload'] = json.loads(job['payload']) if job.get('payload') else {}
+    if job.get('result'):
+        job['result'] = json.loads(job['result'])
+    return job
+
+
+def _selftest_worker(db_path: str, visibility_timeout: float):
+    """
+    selftest 用 worker 进程：按 payload["mode"] 模拟处理结果
+
+    - ok: 完成
+    - fail: 每次都失败，最终进入死信
+    - crash: 第一次领取后进程直接退出（不续约、不提交），等待租约过期后重新投递
+    """
+    queue = WorkQueue(db_path, visibility_timeout=visibility_timeout, retry_delay=0)
+    worker_id = default_worker_id()
+    while True:
+        job = queue.lease(worker_id)
+        if job is None:
+            if queue.depth() == 0:
+                break
+            time.sleep(0.05)
+            continue
+        mode = job['payload'].get('mode')
+        if mode == 'crash' and job['attempts'] == 1:
+            os._exit(1)
+        time.sleep(0.01)
+        if mode == 'fail':
+            queue.fail(job['id'], worker_id, 'selftest failure')
+        else:
+            queue.complete(job['id'], worker_id, {"worker": worker_id})
+    queue.close()
+
+
+def _run_workers(db_path: str, workers: int, visibility_timeout: float, timeout: float = 120):
+    """启动多个 worker 进程直到队列清空；崩溃退出的 worker 会被补充"""
+    import multiprocessing
+
+    ctx = multiprocessing.get_context('spawn')
+    queue = WorkQueue(db_path)
+    deadline = time.time() + timeout
+    procs = []
+    crashed = 0
+    try:
+        while time.time() < deadline:
+            alive = []
+            for proc in procs:
+                if proc.is_alive():
+                    alive.append(proc)
+                elif proc.exitcode != 0:
+                    crashed += 1
+            procs = alive
+            if queue.depth() == 0 and not procs:
+                return crashed
+            while len(procs) < workers and queue.depth() > 0:
+                proc = ctx.Process(target=_selftest_worker, args=(db_path, visibility_timeout))
+                proc.start()
+                procs.append(proc)
+            time.sleep(0.1)
+        raise RuntimeError("selftest 超时，队列未清空")
+    finally:
+        for proc in procs:
+            proc.join(5)
+        queue.close()
+
+
+def selftest(workers: int = 4, jobs: int = 60, visibility_timeout: float = 1.0) -> List[str]:
+    """
+    多进程自检：租约过期重投、去重、死信、requeue_dead
+
+    Returns:
+        失败信息列表，为空表示全部通过
+    """
+    import tempfile
+    import shutil
+
+    failures = []
+    tmp_dir = tempfile.mkdtemp(prefix='work_queue_selftest_')
+    db_path = os.path.join(tmp_dir, 'queue.db')
+    try:
+        queue = WorkQueue(db_path, max_attempts=2)
+        modes = {}
+        for i in range(jobs):
+            mode = 'fail' if i % 10 == 0 else 'crash' if i % 10 == 1 else 'ok'
+            job_id = queue.enqueue('selftest', {"mode": mode, "n": i}, dedupe_key=f"job:{i}")
+            # 未完成的同键任务不重复入队
+            if queue.enqueue('selftest', {"mode": mode, "n": i}, dedupe_key=f"job:{i}") != job_id:
+                failures.append(f"去重失败: job:{i}")
+            modes[job_id] = mode
+
+        crashed = _run_workers(db_path, workers, visibility_timeout)
+        expected_crashes = sum(1 for m in modes.values() if m == 'crash')
+        if crashed < expected_crashes:
+            failures.append(f"崩溃 worker 数 {crashed} < {expected_crashes}")
+
+        for job_id, mode in modes.items():
+            job = queue.get(job_id)
+            if mode == 'fail':
+                if job['state'] != STATE_DEAD or job['attempts'] != 2:
+                    failures.append(f"#{job_id} 应进入死信: {job['state']} / {job['attempts']} 次")
+            elif mode == 'crash':
+                # 第一次租约过期后由其他 worker 重新投递
+                if job['state'] != STATE_DONE or job['attempts'] != 2:
+                    failures.append(f"#{job_id} 应在重投后完成: {job['state']} / {job['attempts']} 次")
+            elif job['state'] != STATE_DONE or job['attempts'] != 1:
+                failures.append(f"#{job_id} 应完成一次: {job['state']} / {job['attempts']} 次")
+
+        # requeue_dead：同键已有新的未完成任务时跳过
+        dead_ids = [job_id for job_id, mode in modes.items() if mode == 'fail']
+        superseded = queue.get(dead_ids[0])['dedupe_key']
+        new_id = queue.enqueue('selftest', {"mode": "ok"}, dedupe_key=superseded)
+        revived = queue.requeue_dead()
+        if revived != len(dead_ids) - 1:
+            failures.append(f"requeue_dead 重新入队 {revived} 个，应为 {len(dead_ids) - 1}")
+        if queue.get(dead_ids[0])['state'] != STATE_DEAD:
+            failures.append("被新任务取代的死信不应重新入队")
+
+        _run_workers(db_path, workers, visibility_timeout)
+        if queue.get(new_id)['state'] != STATE_DONE:
+            failures.append("取代死信的新任务未完成")
+        counts = queue.stats()['counts']
+        if counts[STATE_QUEUED] or counts[STATE_LEASED]:
+            failures.append(f"队列未清空: {counts}")
+        queue.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return failures
+
+
+# CLI 入口
+if __name__ == "__main__":
+    import sys
+    import argparse
+
+    parser = argparse.ArgumentParser(description="SQLite 解析任务队列")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_selftest = sub.add_parser("selftest", help="启动多个本地 worker 进程检查租约/去重/死信")
+    p_selftest.add_argument("--workers", type=int, default=4, help="worker 进程数")
+    p_selftest.add_argument("--jobs", type=int, default=60, help="任务数")
+    args = parser.parse_args()
+
+    start = time.time()
+    failures = selftest(args.workers, args.jobs)
+    for failure in failures:
+        print(failure)
+    print(f"{args.workers} 个 worker, {args.jobs} 个任务, {len(failures)} 个失败, 耗时 {time.time() - start:.1f} 秒")
+    sys.exit(1 if failures else 0)